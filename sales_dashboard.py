@@ -1,57 +1,131 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import plotly.graph_objects as go
+from openpyxl import load_workbook
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-# Load Excel file
-excel_path = 'sales_data.xlsx'
-if os.path.exists(excel_path):
-    df = pd.read_excel(excel_path, engine='openpyxl')
+# Only these columns of the sheet are used by the dashboard
+SHEET_COLUMNS = ['Date', 'Domain', 'Revenue']
+
+def read_sheet(path):
+    # Stream rows out of openpyxl's read-only mode rather than letting pandas
+    # build the whole cell model, and keep just the columns we need
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        # First sheet, as pd.read_excel did; wb.active is whichever tab was last selected
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows)
+        idx = [header.index(col) for col in SHEET_COLUMNS]
+        records = [tuple(row[i] for i in idx) for row in rows if any(v is not None for v in row)]
+    finally:
+        wb.close()
+
+    df = pd.DataFrame.from_records(records, columns=SHEET_COLUMNS)
     df['Date'] = pd.to_datetime(df['Date'], dayfirst=True)
+    df['Revenue'] = df['Revenue'].astype('float64')
+    return df
+
+def parquet_source_mtime(parquet_path):
+    # mtime of the workbook the parquet copy was converted from, or None if
+    # there is no usable copy
+    try:
+        metadata = pq.read_schema(parquet_path).metadata or {}
+    except (OSError, pa.ArrowException):
+        return None
+    value = metadata.get(b'source_mtime')
+    return float(value) if value is not None else None
+
+# cache_resource hands back the same frame on every rerun; cache_data would
+# unpickle a fresh copy of the whole sheet each time. Nothing below mutates df.
+@st.cache_resource(show_spinner=False)
+def load_data(path, mtime):
+    # Parsing the xlsx is slow, so keep a parquet copy next to it. The copy
+    # records the workbook mtime it came from and is redone whenever that
+    # differs, so a replaced workbook with an older mtime is still picked up.
+    parquet_path = os.path.splitext(path)[0] + '.parquet'
+    if parquet_source_mtime(parquet_path) != mtime:
+        df = read_sheet(path)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**table.schema.metadata, b'source_mtime': repr(mtime).encode()})
+        try:
+            pq.write_table(table, parquet_path)
+        except OSError:
+            # Read-only app directory: carry on with the frame already in memory
+            pass
+    else:
+        df = pd.read_parquet(parquet_path, engine='pyarrow')
 
-    def get_fin_year(d):
-        y = d.year
-        return f"{y-1}-{str(y)[-2:]}" if d.month < 4 else f"{y}-{str(y+1)[-2:]}"
+    year = df['Date'].dt.year
+    month = df['Date'].dt.month
+    fy = year.where(month >= 4, year - 1)
+    df['Financial Year'] = fy.astype(str) + '-' + ((fy + 1) % 100).astype(str).str.zfill(2)
 
-    df['Financial Year'] = df['Date'].apply(get_fin_year)
+    fy_start = pd.to_datetime(dict(year=fy, month=4, day=1))
+    df['Week'] = (df['Date'] - fy_start).dt.days // 7 + 1
 
-    def get_fin_week(d):
-        fy_start = datetime(d.year if d.month >= 4 else d.year - 1, 4, 1)
-        return ((d - fy_start).days // 7) + 1
+    # Only a few (year, week) pairs exist, so label each once and map back
+    keys = pd.MultiIndex.from_arrays([fy, df['Week']])
+    week_labels = {}
+    for f, w in keys.unique():
+        week_start = datetime(int(f), 4, 1) + timedelta(weeks=int(w) - 1)
+        week_end = week_start + timedelta(days=6)
+        week_labels[(f, w)] = f"Week {w}: {week_start.strftime('%b %d')} - {week_end.strftime('%b %d')}"
+    df['Week Label'] = pd.Series(week_labels).reindex(keys).to_numpy()
 
-    def get_week_label(d):
-        fy_start = datetime(d.year if d.month >= 4 else d.year - 1, 4, 1)
-        week_num = ((d - fy_start).days // 7) + 1
-        week_start = fy_start + pd.Timedelta(weeks=week_num - 1)
-        week_end = week_start + pd.Timedelta(days=6)
-        return f"Week {week_num}: {week_start.strftime('%b %d')} - {week_end.strftime('%b %d')}"
+    # Categorical columns make the repeated equality filters and groupbys cheap
+    df['Domain'] = df['Domain'].astype('category')
+    df['Financial Year'] = df['Financial Year'].astype('category')
+    return df
 
-    df['Week'] = df['Date'].apply(get_fin_week)
-    df['Week Label'] = df['Date'].apply(get_week_label)
-else:
+# Load Excel file (mtime is part of the cache key so edits to the sheet are picked up)
+excel_path = 'sales_data.xlsx'
+if not os.path.exists(excel_path):
     st.error("Error: sales_data.xlsx file not found!")
     st.stop()
+data_mtime = os.path.getmtime(excel_path)
+df = load_data(excel_path, data_mtime)
+
+# Right-aligned byte layout for Indian grouping (12,34,567) of up to 19 digits.
+# DIGIT_COLS holds the column of each digit, least significant first; a comma
+# goes in COMMA_COLS[i] once a number has more than COMMA_DIGITS[i] digits
+FORMAT_WIDTH = 28
+POW10 = 10 ** np.arange(19, dtype=np.int64)
+COMMA_DIGITS = np.arange(3, 19, 2)
+DIGIT_COLS = FORMAT_WIDTH - 1 - np.arange(19) - np.searchsorted(COMMA_DIGITS, np.arange(19), side='right')
+COMMA_COLS = DIGIT_COLS[COMMA_DIGITS] + 1
+
+def indian_format_vec(values):
+    # Formats a whole column at once by writing ASCII into a byte buffer
+    values = np.asarray(values).astype(np.int64)
+    rest = np.abs(values)
+    ndigits = (rest[:, None] >= POW10[1:]).sum(axis=1) + 1
+    digits = (rest[:, None] // POW10) % 10
+
+    buf = np.full((len(values), FORMAT_WIDTH), ord(' '), dtype=np.uint8)
+    buf[:, DIGIT_COLS] = np.where(ndigits[:, None] > np.arange(19), ord('0') + digits, ord(' '))
+    buf[:, COMMA_COLS] = np.where(ndigits[:, None] > COMMA_DIGITS, ord(','), ord(' '))
+    neg = values < 0
+    buf[neg, DIGIT_COLS[ndigits[neg] - 1] - 1] = ord('-')
+
+    return np.char.lstrip(buf.view(f'S{FORMAT_WIDTH}').ravel().astype(str))
 
 def indian_format(x):
     try:
         x = int(x)
     except:
         return x
-    s = str(x)[::-1]
-    groups = [s[:3]]
-    s = s[3:]
-    while s:
-        groups.append(s[:2])
-        s = s[2:]
-    return ','.join(g[::-1] for g in groups[::-1])
+    return str(indian_format_vec([x])[0])
 
 st.set_page_config(layout="wide")
 st.title("📊 Weekly Sales Dashboard")
 
 with st.sidebar:
     st.header("Filters")
-    fy_options = sorted(df['Financial Year'].unique(), reverse=True)
+    fy_options = sorted(df['Financial Year'].cat.categories, reverse=True)
     if len(fy_options) < 2:
         st.error("Need at least 2 financial years of data for comparison")
         st.stop()
@@ -62,105 +136,154 @@ with st.sidebar:
         st.stop()
     fy2 = st.selectbox("Select Second (Older) Financial Year", available_fy2, index=0)
 
-def build_card(dataframe, title, domain_filter=None):
+@st.cache_data(show_spinner=False)
+def weekly_aggregates(mtime):
+    # Group the raw rows once per data load; the cards just slice these. Rows
+    # with no Domain are kept (dropna=False) so they still count towards the
+    # combined totals, which are rolled up from the small per-domain frame.
+    keys = ['Financial Year', 'Week', 'Week Label']
+    agg = df.groupby(['Domain'] + keys, observed=True, dropna=False, as_index=False)['Revenue'].sum()
+    agg_all = agg.groupby(keys, observed=True, as_index=False)['Revenue'].sum()
+    return agg, agg_all
+
+@st.cache_data(show_spinner=False)
+def weekly_revenue(domain_filter, fy1, fy2, mtime):
+    agg, agg_all = weekly_aggregates(mtime)
     if domain_filter:
-        filtered = dataframe[dataframe['Domain'] == domain_filter]
+        weekly = agg[agg['Domain'] == domain_filter]
     else:
-        filtered = dataframe.copy()
+        weekly = agg_all
+
+    if fy1 not in weekly['Financial Year'].unique() or fy2 not in weekly['Financial Year'].unique():
+        return None
 
-    if fy1 not in filtered['Financial Year'].unique() or fy2 not in filtered['Financial Year'].unique():
-        return
+    df_y1 = weekly[weekly['Financial Year'] == fy1].set_index('Week')
+    df_y2 = weekly[weekly['Financial Year'] == fy2].set_index('Week')
 
-    df_y1 = filtered[filtered['Financial Year'] == fy1].groupby(['Week', 'Week Label'], as_index=False)['Revenue'].sum()
-    df_y2 = filtered[filtered['Financial Year'] == fy2].groupby(['Week', 'Week Label'], as_index=False)['Revenue'].sum()
+    # Weeks are small integers, so line the two years up on them directly
+    # rather than through an outer merge; labels come from fy1 where it has the week
+    weeks = np.union1d(df_y1.index, df_y2.index)
+    labels = pd.concat([df_y1['Week Label'], df_y2['Week Label']])
+    labels = labels[~labels.index.duplicated()]
 
-    df_y1.rename(columns={'Revenue': f'Revenue_{fy1}'}, inplace=True)
-    df_y2.rename(columns={'Revenue': f'Revenue_{fy2}'}, inplace=True)
+    return pd.DataFrame({
+        'Week': weeks,
+        'Week Label': labels.reindex(weeks).to_numpy(),
+        f'Revenue_{fy1}': df_y1['Revenue'].reindex(weeks, fill_value=0).to_numpy(),
+        f'Revenue_{fy2}': df_y2['Revenue'].reindex(weeks, fill_value=0).to_numpy()
+    })
 
-    merged = pd.merge(df_y1, df_y2, on=['Week', 'Week Label'], how='outer').fillna(0).sort_values('Week')
+@st.cache_data(show_spinner=False)
+def trend_figure(domain_filter, fy1, fy2, mtime):
+    # Caches the Python-side trace and layout construction only; st.plotly_chart
+    # still rebuilds and validates a Figure from this dict on every rerun
+    merged = weekly_revenue(domain_filter, fy1, fy2, mtime)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=merged['Week'], y=np.cumsum(merged[f'Revenue_{fy1}'].to_numpy()), 
+                           mode='lines', name=fy1, line=dict(color='blue')))
+    fig.add_trace(go.Scatter(x=merged['Week'], y=np.cumsum(merged[f'Revenue_{fy2}'].to_numpy()), 
+                           mode='lines', name=fy2, line=dict(color='orange')))
+    fig.update_layout(
+        title="Cumulative Weekly Sales Trend",
+        xaxis_title="Week Number",
+        yaxis_title="Revenue",
+        xaxis=dict(tickmode='linear', tick0=1, dtick=5),
+        height=300,
+        template="plotly_white",
+        legend=dict(x=0, y=1.1, orientation='h'),
+        margin=dict(l=20, r=20, t=40, b=20),
+        yaxis_tickformat=','
+    )
+    return fig.to_dict()
+
+@st.cache_data(show_spinner=False)
+def compute_card(domain_filter, fy1, fy2, mtime):
+    # Everything a card shows except the widgets themselves; the payload is at
+    # most 53 rows so it is cheap to keep around between reruns
+    merged = weekly_revenue(domain_filter, fy1, fy2, mtime)
+    if merged is None:
+        return None
 
     rev1_col = f'Revenue_{fy1}'
     rev2_col = f'Revenue_{fy2}'
     total_rev2 = merged[rev2_col].sum()
     total_rev1 = merged[rev1_col].sum()
 
-    merged['Variation (%)'] = merged.apply(
-        lambda row: ((row[rev1_col] - row[rev2_col]) * 100 / total_rev2) if total_rev2 != 0 else 0,
-        axis=1
-    ).round(2)
+    rev1 = merged[rev1_col].to_numpy()
+    rev2 = merged[rev2_col].to_numpy()
+    diff = rev1 - rev2
+    merged['Variation (%)'] = (diff * 100 / total_rev2).round(2) if total_rev2 != 0 else 0
+    merged['Variation in Amount'] = np.where((rev1 != 0) | (rev2 != 0), indian_format_vec(diff), '-')
 
-    merged['Variation in Amount'] = merged.apply(
-        lambda row: indian_format(row[rev1_col] - row[rev2_col]) if (row[rev1_col] != 0 or row[rev2_col] != 0) else '-',
-        axis=1
-    )
+    merged[f'{rev1_col}_formatted'] = np.where(rev1 != 0, indian_format_vec(rev1), '-')
+    merged[f'{rev2_col}_formatted'] = np.where(rev2 != 0, indian_format_vec(rev2), '-')
 
-    merged[f'{rev1_col}_formatted'] = merged[rev1_col].apply(lambda x: indian_format(x) if x != 0 else '-')
-    merged[f'{rev2_col}_formatted'] = merged[rev2_col].apply(lambda x: indian_format(x) if x != 0 else '-')
+    return merged.to_dict('list'), total_rev1, total_rev2
+
+def render_card(title, card, fy1, fy2, domain_filter=None):
+    weekly, total_rev1, total_rev2 = card
+    merged = pd.DataFrame(weekly)
+    rev1_col = f'Revenue_{fy1}'
+    rev2_col = f'Revenue_{fy2}'
 
     total_var = ((total_rev1 - total_rev2) * 100 / total_rev2) if total_rev2 != 0 else 0
     total_amount_variation = indian_format(total_rev1 - total_rev2) if (total_rev1 != 0 or total_rev2 != 0) else '-'
 
-    total_row = pd.DataFrame([{
-        'Week': 'Total',
-        f'{fy1} Revenue': indian_format(total_rev1) if total_rev1 != 0 else '-',
-        f'{fy2} Revenue': indian_format(total_rev2) if total_rev2 != 0 else '-',
-        'Variation (%)': round(total_var, 2) if total_rev2 != 0 else '-',
-        'Variation in Amount': total_amount_variation
-    }])
+    rev1_text = indian_format(total_rev1) if total_rev1 != 0 else '-'
+    rev2_text = indian_format(total_rev2) if total_rev2 != 0 else '-'
+    var_text = f"{total_var:.2f}%" if total_rev2 != 0 else '-'
+
+    # The totals are a single row, so render them as a small HTML block
+    # rather than going through a DataFrame and Styler
+    if total_rev2 != 0 and total_var > 0:
+        total_bg = 'background-color: #d1e7dd; '
+    elif total_rev2 != 0 and total_var < 0:
+        total_bg = 'background-color: #f8d7da; '
+    else:
+        total_bg = ''
+    total_html = (
+        f"<div style='{total_bg}padding: 0.75rem; border-radius: 0.5rem'>"
+        f"<b>Total</b><br>"
+        f"{fy1} Revenue: {rev1_text}<br>"
+        f"{fy2} Revenue: {rev2_text}<br>"
+        f"Variation (%): {var_text}<br>"
+        f"Variation in Amount: {total_amount_variation}"
+        "</div>"
+    )
+
+    # Styler callback just hands back these precomputed CSS strings
+    var = merged['Variation (%)'].to_numpy()
+    var_colors = np.where(var > 0, 'color: green', np.where(var < 0, 'color: red', ''))
 
     with st.expander(title, expanded=False):
         col1, col2 = st.columns(2)
         with col1:
-            st.dataframe(
-                total_row.style
-                .apply(lambda x: ['background-color: #d1e7dd' if isinstance(x['Variation (%)'], (int, float)) and x['Variation (%)'] > 0 
-                                 else 'background-color: #f8d7da' if isinstance(x['Variation (%)'], (int, float)) and x['Variation (%)'] < 0 
-                                 else '' for i, v in enumerate(x)], 
-                       axis=1)
-                .format({'Variation (%)': "{:.2f}%" if isinstance(total_var, (int, float)) else ""}),
-                use_container_width=True,
-                hide_index=True
-            )
+            st.markdown(total_html, unsafe_allow_html=True)
         with col2:
-            st.metric(f"Total {fy1} Revenue", indian_format(total_rev1) if total_rev1 != 0 else '-')
-            st.metric(f"Total {fy2} Revenue", indian_format(total_rev2) if total_rev2 != 0 else '-')
-            st.metric("Total Variation", 
-                     f"{total_var:.2f}%" if total_rev2 != 0 else '-', 
+            st.metric(f"Total {fy1} Revenue", rev1_text)
+            st.metric(f"Total {fy2} Revenue", rev2_text)
+            st.metric("Total Variation", var_text,
                      delta_color="inverse" if total_var < 0 else "normal")
 
-        merged[f'Cumulative_{rev1_col}'] = merged[rev1_col].cumsum()
-        merged[f'Cumulative_{rev2_col}'] = merged[rev2_col].cumsum()
-
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=merged['Week'], y=merged[f'Cumulative_{rev1_col}'], 
-                               mode='lines', name=fy1, line=dict(color='blue')))
-        fig.add_trace(go.Scatter(x=merged['Week'], y=merged[f'Cumulative_{rev2_col}'], 
-                               mode='lines', name=fy2, line=dict(color='orange')))
-        fig.update_layout(
-            title="Cumulative Weekly Sales Trend",
-            xaxis_title="Week Number",
-            yaxis_title="Revenue",
-            xaxis=dict(tickmode='linear', tick0=1, dtick=5),
-            height=300,
-            template="plotly_white",
-            legend=dict(x=0, y=1.1, orientation='h'),
-            margin=dict(l=20, r=20, t=40, b=20),
-            yaxis_tickformat=','
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(trend_figure(domain_filter, fy1, fy2, data_mtime), use_container_width=True)
 
         display_df = merged[['Week Label', f'{rev1_col}_formatted', f'{rev2_col}_formatted', 'Variation (%)', 'Variation in Amount']]
         display_df.columns = ['Week', f'{fy1} Revenue', f'{fy2} Revenue', 'Variation (%)', 'Variation in Amount']
 
         st.dataframe(
             display_df.style
-            .applymap(lambda x: 'color: green' if isinstance(x, (int, float)) and x > 0 else 
-                     ('color: red' if isinstance(x, (int, float)) and x < 0 else ''), subset=['Variation (%)'])
+            .apply(lambda _: var_colors, subset=['Variation (%)'], axis=0)
             .format({'Variation (%)': "{:.2f}%" if total_rev2 != 0 else ""}),
             use_container_width=True,
             hide_index=True
         )
 
+def build_card(title, domain_filter=None):
+    card = compute_card(domain_filter, fy1, fy2, data_mtime)
+    if card is not None:
+        render_card(title, card, fy1, fy2, domain_filter)
+
 st.write("Click on the sections below to expand and view the sales data:")
 
 DOMAIN_ORDER = [
@@ -174,9 +297,11 @@ DOMAIN_ORDER = [
     "Consulting"
 ]
 
+present_domains = set(df['Domain'].cat.categories)
+
 for domain in DOMAIN_ORDER:
     if domain is None:
-        build_card(df, "🌍 All Domains Combined")
+        build_card("🌍 All Domains Combined")
     else:
-        if domain in df['Domain'].unique():
-            build_card(df, f"📂 {domain}", domain_filter=domain)
+        if domain in present_domains:
+            build_card(f"📂 {domain}", domain_filter=domain)